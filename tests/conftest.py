@@ -1,11 +1,14 @@
+import copy
 import glob
 import os
 import random
+import shutil
 from functools import wraps
 
 import cudf
 import numpy as np
 import pytest
+import rmm
 
 import nvtabular.io
 
@@ -52,6 +55,12 @@ sample_stats = {
 }
 
 
+@pytest.fixture(scope="session", autouse=True)
+def rmm_pool():
+    # Serve every cudf allocation in the session from one pre-allocated pool
+    rmm.reinitialize(pool_allocator=True, managed_memory=False, initial_pool_size=2 * 10 ** 9)
+
+
 @pytest.fixture(scope="session")
 def datasets(tmpdir_factory):
     df = cudf.datasets.timeseries(
@@ -109,29 +118,73 @@ def datasets(tmpdir_factory):
     return datadir
 
 
+@pytest.fixture(scope="session")
+def fast_parquet(tmpdir_factory, datasets):
+    # Uncompressed copy of the parquet dataset, written once per session
+    out = tmpdir_factory.mktemp("fast_parquet")
+    for path in glob.glob(str(datasets["parquet"]) + "/*.parquet"):
+        cudf.read_parquet(path).to_parquet(
+            str(out.join(os.path.basename(path))), chunk_size=1000, compression=None
+        )
+    return out
+
+
+@pytest.fixture(scope="module")
+def parquet_expect(datasets, arrow_tables):
+    # (sorted paths, first file, all files) of the parquet dataset
+    paths = sorted(glob.glob(str(datasets["parquet"]) + "/*.parquet"))
+    frames = [cudf.DataFrame.from_arrow(table) for table in arrow_tables["parquet"]]
+    return paths, frames[0], cudf.concat(frames, axis=0)
+
+
+@pytest.fixture(scope="function")
+def ref_df(request):
+    # First (sorted) file of the engine's own dataset
+    engine = request.getfixturevalue("engine")
+    return cudf.DataFrame.from_arrow(request.getfixturevalue("arrow_tables")[engine][0])
+
+
 @pytest.fixture(scope="function")
 def paths(request):
     engine = request.getfixturevalue("engine")
+    if engine == "parquet":
+        return sorted(glob.glob(str(request.getfixturevalue("fast_parquet")) + "/*.parquet"))
     datasets = request.getfixturevalue("datasets")
-    return glob.glob(str(datasets[engine]) + "/*." + engine.split("-")[0])
+    return sorted(glob.glob(str(datasets[engine]) + "/*." + engine.split("-")[0]))
+
+
+def read_dataset_file(engine, path):
+    if engine == "parquet":
+        return cudf.read_parquet(path, columns=mycols_pq)
+    elif engine in ("csv", "csv-no-header"):
+        if engine == "csv-no-header":
+            kwargs = {"header": None, "names": allcols_csv}
+        else:
+            kwargs = {"header": 0}
+        return cudf.read_csv(path, usecols=mycols_csv, **kwargs)[mycols_csv]
+    else:
+        raise ValueError("unknown engine:" + engine)
+
+
+@pytest.fixture(scope="session")
+def arrow_tables(datasets):
+    # Host-side Arrow copy of every dataset file (sorted by path), parsed once
+    tables = {}
+    for engine in ("parquet", "csv", "csv-no-header"):
+        paths = sorted(glob.glob(str(datasets[engine]) + "/*." + engine.split("-")[0]))
+        tables[engine] = [
+            read_dataset_file(engine, path).to_arrow(preserve_index=False) for path in paths
+        ]
+    return tables
 
 
 @pytest.fixture(scope="function")
 def df(request):
     engine = request.getfixturevalue("engine")
-    paths = request.getfixturevalue("paths")
-    if engine == "parquet":
-        df1 = cudf.read_parquet(paths[0])[mycols_pq]
-        df2 = cudf.read_parquet(paths[1])[mycols_pq]
-    elif engine == "csv-no-header":
-        df1 = cudf.read_csv(paths[0], header=None, names=allcols_csv)[mycols_csv]
-        df2 = cudf.read_csv(paths[1], header=None, names=allcols_csv)[mycols_csv]
-    elif engine == "csv":
-        df1 = cudf.read_csv(paths[0], header=0)[mycols_csv]
-        df2 = cudf.read_csv(paths[1], header=0)[mycols_csv]
-    else:
+    tables = request.getfixturevalue("arrow_tables")
+    if engine not in tables:
         raise ValueError("unknown engine:" + engine)
-    gdf = cudf.concat([df1, df2], axis=0)
+    gdf = cudf.concat([cudf.DataFrame.from_arrow(table) for table in tables[engine]], axis=0)
     gdf["id"] = gdf["id"].astype("int64")
     return gdf
 
@@ -156,6 +209,41 @@ def dataset(request):
     )
 
 
+@pytest.fixture(scope="module")
+def tidy(request):
+    # Output directories to remove once the module finishes
+    paths = set()
+
+    def remove_paths():
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+    request.addfinalizer(remove_paths)
+    return paths
+
+
+@pytest.fixture(scope="module")
+def workflow_cache():
+    return {}
+
+
+def fitted_workflow(request, cache, key, build_fn):
+    # Fit once per key, but hand every test its own copy to modify
+    if key not in cache:
+        processor = build_fn()
+        processor.update_stats(request.getfixturevalue("dataset"))
+        cache[key] = processor
+    return copy.deepcopy(cache[key])
+
+
+def assert_cats_equal(cats, cats_expected):
+    # Compared on device; the first category is the null slot, which reads
+    # back as "None" after a yaml round trip
+    assert len(cats) == len(cats_expected) + 1
+    assert bool((cats[:1].fillna("None") == "None").all())
+    assert bool((cats[1:].reset_index(drop=True) == cats_expected.reset_index(drop=True)).all())
+
+
 def cleanup(func):
     @wraps(func)
     def func_up(*args, **kwargs):
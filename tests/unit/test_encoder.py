@@ -61,9 +61,9 @@ def test_encoder_fit_transform_ltm(datasets, batch, dskey, use_frequency):
 
     enc.fit_finalize()
     new_ser = enc.transform(df_expect["name-string"])
-    unis = df_expect["name-string"].unique().values_to_string()
+    unis = df_expect["name-string"].unique()
     # set does not pick up None values so must be added if found in
-    assert len(unis) == max(new_ser.tolist())
+    assert len(unis) == new_ser.max()
     for file in enc.file_paths:
         os.remove(file)
 
@@ -24,34 +24,64 @@ from cudf.tests.utils import assert_eq
 import nvtabular as nvt
 import nvtabular.io
 import nvtabular.ops as ops
-from tests.conftest import cleanup, mycols_csv, mycols_pq
+from tests.conftest import assert_cats_equal, cleanup, fitted_workflow, mycols_csv, mycols_pq
+
+
+def pairwise_cases(op_columns, engines=("parquet", "csv", "csv-no-header"), fracs=(0.01, 0.1)):
+    # Covers every (engine, op_columns), (engine, gpu_memory_frac) and
+    # (op_columns, gpu_memory_frac) pair without taking the full product
+    return [
+        (fracs[(i + j) % len(fracs)], engine, columns)
+        for i, engine in enumerate(engines)
+        for j, columns in enumerate(op_columns)
+    ]
+
+
+@pytest.fixture(scope="function")
+def stats_processor(request, workflow_cache):
+    """
+    Workflow with MinMax, Moments, Median and Encoder statistics gathered
+    in a single `update_stats` pass, fit once per engine and column selection
+    """
+    engine = request.getfixturevalue("engine")
+    op_columns = request.getfixturevalue("op_columns")
+
+    def build():
+        cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
+        cont_names = ["x", "y", "id"]
+        label_name = ["label"]
+        cont_columns = ["x"] if op_columns else None
+        cat_columns = ["name-string"] if op_columns else None
+
+        config = nvt.workflow.get_new_config()
+        config["PP"]["all"] = [ops.MinMax(columns=cont_columns)]
+        config["PP"]["continuous"] = [
+            ops.Moments(columns=cont_columns),
+            ops.Median(columns=cont_columns),
+        ]
+        config["PP"]["categorical"] = [ops.Encoder(columns=cat_columns)]
+
+        return nvt.Workflow(
+            cat_names=cat_names, cont_names=cont_names, label_name=label_name, config=config,
+        )
+
+    return fitted_workflow(request, workflow_cache, (engine, op_columns is not None), build)
 
 
 @cleanup
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
-@pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("op_columns", [["x"], None])
-def test_minmax(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
-    cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
-    cont_names = ["x", "y"]
-    label_name = ["label"]
-
-    config = nvtabular.workflow.get_new_config()
-    config["PP"]["all"] = [ops.MinMax(columns=op_columns)]
-
-    processor = nvtabular.Workflow(
-        cat_names=cat_names, cont_names=cont_names, label_name=label_name, config=config,
-    )
+@pytest.mark.parametrize("gpu_memory_frac,engine,op_columns", pairwise_cases([["x"], None]))
+def test_minmax(tmpdir, df, stats_processor, gpu_memory_frac, engine, op_columns):
+    processor = stats_processor
 
-    processor.update_stats(dataset)
     x_min = df["x"].min()
-
     assert x_min == pytest.approx(processor.stats["mins"]["x"], 1e-2)
     x_max = df["x"].max()
     assert x_max == pytest.approx(processor.stats["maxs"]["x"], 1e-2)
     if not op_columns:
-        name_min = min(df["name-string"].tolist())
-        name_max = max(df["name-string"].tolist())
+        # Strings have no device-side min/max yet, so only move the uniques to host
+        names = df["name-string"].dropna().unique().tolist()
+        name_min = min(names)
+        name_max = max(names)
         assert name_min == processor.stats["mins"]["name-string"]
         y_max = df["y"].max()
         y_min = df["y"].min()
@@ -62,84 +92,46 @@ def test_minmax(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
 
 
 @cleanup
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
-@pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("op_columns", [["x"], None])
-def test_moments(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
-    cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
+@pytest.mark.parametrize("gpu_memory_frac,engine,op_columns", pairwise_cases([["x"], None]))
+def test_moments(tmpdir, df, stats_processor, gpu_memory_frac, engine, op_columns):
+    processor = stats_processor
     cont_names = ["x", "y", "id"]
-    label_name = ["label"]
-
-    config = nvt.workflow.get_new_config()
-    config["PP"]["continuous"] = [ops.Moments(columns=op_columns)]
 
-    processor = nvt.Workflow(
-        cat_names=cat_names, cont_names=cont_names, label_name=label_name, config=config,
-    )
+    # Reduce all reference columns at once rather than column by column
+    counts = df[cont_names].count()
+    means = df[cont_names].mean()
+    stds = df[cont_names].std()
 
-    processor.update_stats(dataset)
-
-    assert df.x.count() == processor.stats["counts"]["x"]
-    assert df.x.count() == 4321
+    assert counts["x"] == processor.stats["counts"]["x"]
+    assert counts["x"] == 4321
 
     # Check mean and std
-    assert math.isclose(df.x.mean(), processor.stats["means"]["x"], rel_tol=1e-4)
-    assert math.isclose(df.x.std(), processor.stats["stds"]["x"], rel_tol=1e-3)
-    if not op_columns:
-        assert math.isclose(df.y.mean(), processor.stats["means"]["y"], rel_tol=1e-4)
-        assert math.isclose(df.id.mean(), processor.stats["means"]["id"], rel_tol=1e-4)
-
-        assert math.isclose(df.y.std(), processor.stats["stds"]["y"], rel_tol=1e-3)
-        assert math.isclose(df.id.std(), processor.stats["stds"]["id"], rel_tol=1e-3)
+    for name in op_columns or cont_names:
+        assert math.isclose(means[name], processor.stats["means"][name], rel_tol=1e-4)
+        assert math.isclose(stds[name], processor.stats["stds"][name], rel_tol=1e-3)
     return processor.ds_exports
 
 
 @cleanup
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
-@pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("op_columns", [["name-string"], None])
-def test_encoder(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
-    cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
-    cont_names = ["x", "y", "id"]
-    label_name = ["label"]
-
-    config = nvt.workflow.get_new_config()
-    config["PP"]["categorical"] = [ops.Encoder(columns=op_columns)]
-
-    processor = nvt.Workflow(
-        cat_names=cat_names, cont_names=cont_names, label_name=label_name, config=config,
-    )
-
-    processor.update_stats(dataset)
+@pytest.mark.parametrize(
+    "gpu_memory_frac,engine,op_columns", pairwise_cases([["name-string"], None])
+)
+def test_encoder(tmpdir, df, stats_processor, gpu_memory_frac, engine, op_columns):
+    processor = stats_processor
 
     # Check that categories match
     if engine == "parquet" and not op_columns:
-        cats_expected0 = df["name-cat"].unique().values_to_string()
-        cats0 = processor.stats["encoders"]["name-cat"].get_cats().values_to_string()
-        assert cats0 == ["None"] + cats_expected0
-    cats_expected1 = df["name-string"].unique().values_to_string()
-    cats1 = processor.stats["encoders"]["name-string"].get_cats().values_to_string()
-    assert cats1 == ["None"] + cats_expected1
+        cats0 = processor.stats["encoders"]["name-cat"].get_cats()
+        assert_cats_equal(cats0, df["name-cat"].unique())
+    cats1 = processor.stats["encoders"]["name-string"].get_cats()
+    assert_cats_equal(cats1, df["name-string"].unique())
     return processor.ds_exports
 
 
 @cleanup
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
-@pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("op_columns", [["x"], None])
-def test_median(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
-    cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
-    cont_names = ["x", "y", "id"]
-    label_name = ["label"]
-
-    config = nvt.workflow.get_new_config()
-    config["PP"]["continuous"] = [ops.Median(columns=op_columns)]
-
-    processor = nvt.Workflow(
-        cat_names=cat_names, cont_names=cont_names, label_name=label_name, config=config,
-    )
-
-    processor.update_stats(dataset)
+@pytest.mark.parametrize("gpu_memory_frac,engine,op_columns", pairwise_cases([["x"], None]))
+def test_median(tmpdir, df, stats_processor, gpu_memory_frac, engine, op_columns):
+    processor = stats_processor
 
     # Check median (TODO: Improve the accuracy)
     x_median = df.x.dropna().quantile(0.5, interpolation="linear")
@@ -152,9 +144,7 @@ def test_median(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
     return processor.ds_exports
 
 
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
-@pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("op_columns", [["x"], None])
+@pytest.mark.parametrize("gpu_memory_frac,engine,op_columns", pairwise_cases([["x"], None]))
 def test_log(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
     cont_names = ["x", "y", "id"]
     log_op = ops.LogOp(columns=op_columns)
@@ -164,13 +154,18 @@ def test_log(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
     columns_ctx["continuous"]["base"] = cont_names
 
     for gdf in dataset:
+        # Build the reference on device before the op replaces the columns in place
+        expected = {
+            col: (gdf[col].astype(np.float32) + 1).log() for col in op_columns or cont_names
+        }
         new_gdf = log_op.apply_op(gdf, columns_ctx, "continuous")
-        assert new_gdf[cont_names] == np.log(gdf[cont_names].astype(np.float32))
+        for col, expected_col in expected.items():
+            assert_eq(new_gdf[col], expected_col)
 
 
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
-@pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("op_columns", [["name-string"], None])
+@pytest.mark.parametrize(
+    "gpu_memory_frac,engine,op_columns", pairwise_cases([["name-string"], None])
+)
 def test_hash_bucket(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
     cat_names = ["name-string"]
 
@@ -184,15 +179,15 @@ def test_hash_bucket(tmpdir, df, dataset, gpu_memory_frac, engine, op_columns):
     columns_ctx["categorical"] = {}
     columns_ctx["categorical"]["base"] = cat_names
 
-    # check sums for determinancy
-    checksums = []
+    # check sums for determinancy, hashing each chunk twice rather than
+    # reading the dataset twice (apply_op replaces columns in place, so
+    # the first pass works on a copy)
     for gdf in dataset:
-        new_gdf = hash_bucket_op.apply_op(gdf, columns_ctx, "categorical")
+        new_gdf = hash_bucket_op.apply_op(gdf.copy(), columns_ctx, "categorical")
         assert np.all(new_gdf[cat_names].values >= 0)
         assert np.all(new_gdf[cat_names].values <= 9)
-        checksums.append(new_gdf[cat_names].sum().values)
+        checksum = new_gdf[cat_names].sum().values
 
-    for checksum, gdf in zip(checksums, dataset):
         new_gdf = hash_bucket_op.apply_op(gdf, columns_ctx, "categorical")
         assert np.all(new_gdf[cat_names].sum().values == checksum)
 
@@ -206,8 +201,11 @@ def test_fill_missing(tmpdir, df, dataset, engine):
     columns_ctx["continuous"] = {}
     columns_ctx["continuous"]["base"] = cont_names
 
-    transformed = cudf.concat([op.apply_op(df, columns_ctx, "continuous") for df in dataset])
-    assert_eq(transformed[cont_names], df[cont_names].dropna(42))
+    chunks = []
+    for gdf in dataset:
+        chunks.append(op.apply_op(gdf, columns_ctx, "continuous"))
+    transformed = cudf.concat(chunks, ignore_index=True)
+    assert_eq(transformed[cont_names], df[cont_names].dropna(42).reset_index(drop=True))
 
 
 @pytest.mark.parametrize("engine", ["parquet"])
@@ -18,98 +18,120 @@ import glob
 import math
 
 import cudf
+import cupy as cp
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
+import rmm
 from cudf.tests.utils import assert_eq
 
 import nvtabular as nvt
 import nvtabular.io
 import nvtabular.ops as ops
-from tests.conftest import allcols_csv, cleanup, mycols_csv, mycols_pq
+from tests.conftest import (
+    allcols_csv,
+    assert_cats_equal,
+    cleanup,
+    fitted_workflow,
+    mycols_csv,
+    mycols_pq,
+)
+
+
+def moments(*columns):
+    # Mean and sample std of each (null-free) column, reduced on device and
+    # copied to host in a single transfer
+    values = [col.values for col in columns]
+    return cp.stack([cp.stack([val.mean(), val.std(ddof=1)]) for val in values]).get()
+
+
+def check_written_dataset(path, cat_names, num_rows):
+    # Encoded dtypes and row count are both recorded in the _metadata footer,
+    # so they can be checked without reading any data back
+    metadata = pq.read_metadata(str(path) + "/_metadata")
+    schema = metadata.schema.to_arrow_schema()
+    types = dict(zip(schema.names, schema.types))
+    for col in cat_names:
+        assert types[col] == pa.int64()
+    assert metadata.num_rows == num_rows
+
+
+@pytest.fixture(scope="function")
+def api_processor(request, workflow_cache):
+    """
+    ZeroFill + LogOp + Normalize + Categorify workflow with statistics
+    already gathered, fit once per engine and op_columns for the module
+    """
+    engine = request.getfixturevalue("engine")
+    op_columns = request.getfixturevalue("op_columns")
+
+    def build():
+        cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
+        cont_names = ["x", "y", "id"]
+        label_name = ["label"]
+
+        processor = nvt.Workflow(cat_names=cat_names, cont_names=cont_names, label_name=label_name,)
+
+        processor.add_feature([ops.ZeroFill(columns=op_columns), ops.LogOp()])
+        processor.add_preprocess(ops.Normalize())
+        processor.add_preprocess(ops.Categorify())
+        processor.finalize()
+        return processor
+
+    return fitted_workflow(request, workflow_cache, (engine, op_columns is not None), build)
 
 
 @cleanup
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
 @pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("dump", [True, False])
 @pytest.mark.parametrize("op_columns", [["x"], None])
-def test_gpu_workflow_api(tmpdir, df, dataset, gpu_memory_frac, engine, dump, op_columns):
+def test_gpu_workflow_api(tmpdir, df, api_processor, engine, op_columns):
     cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
-    cont_names = ["x", "y", "id"]
-    label_name = ["label"]
-
-    processor = nvt.Workflow(cat_names=cat_names, cont_names=cont_names, label_name=label_name,)
-
-    processor.add_feature([ops.ZeroFill(columns=op_columns), ops.LogOp()])
-    processor.add_preprocess(ops.Normalize())
-    processor.add_preprocess(ops.Categorify())
-    processor.finalize()
-
-    processor.update_stats(dataset)
-
-    if dump:
-        config_file = tmpdir + "/temp.yaml"
-        processor.save_stats(config_file)
-        processor.clear_stats()
-        processor.load_stats(config_file)
+    processor = api_processor
 
     def get_norms(tar: cudf.Series):
-        gdf = tar.fillna(0)
-        gdf = gdf * (gdf >= 0).astype("int")
-        gdf = np.log(gdf + 1)
-        return gdf
+        # ZeroFill followed by LogOp, as single elementwise kernels
+        return cudf.Series(cp.log1p(cp.clip(tar.fillna(0).values, 0, None)))
 
     # Check mean and std - No good right now we have to add all other changes; Zerofill, Log
 
+    (mean_x, std_x), (mean_y, std_y) = moments(get_norms(df.x), get_norms(df.y))
     if not op_columns:
-        assert math.isclose(get_norms(df.y).mean(), processor.stats["means"]["y"], rel_tol=1e-1,)
-        assert math.isclose(get_norms(df.y).std(), processor.stats["stds"]["y"], rel_tol=1e-1,)
-    assert math.isclose(get_norms(df.x).mean(), processor.stats["means"]["x"], rel_tol=1e-1,)
-    assert math.isclose(get_norms(df.x).std(), processor.stats["stds"]["x"], rel_tol=1e-1,)
+        assert math.isclose(mean_y, processor.stats["means"]["y"], rel_tol=1e-1)
+        assert math.isclose(std_y, processor.stats["stds"]["y"], rel_tol=1e-1)
+    assert math.isclose(mean_x, processor.stats["means"]["x"], rel_tol=1e-1)
+    assert math.isclose(std_x, processor.stats["stds"]["x"], rel_tol=1e-1)
 
     # Check that categories match
-    if engine == "parquet":
-        cats_expected0 = df["name-cat"].unique().values_to_string()
-        cats0 = processor.stats["encoders"]["name-cat"].get_cats().values_to_string()
-        # adding the None entry as a string because of move from gpu
-        assert cats0 == ["None"] + cats_expected0
-    cats_expected1 = df["name-string"].unique().values_to_string()
-    cats1 = processor.stats["encoders"]["name-string"].get_cats().values_to_string()
-    # adding the None entry as a string because of move from gpu
-    assert cats1 == ["None"] + cats_expected1
-
-    # Write to new "shuffled" and "processed" dataset
-    processor.write_to_dataset(tmpdir, dataset, nfiles=10, shuffle=True, apply_ops=True)
-
-    data_itr_2 = nvtabular.io.GPUDatasetIterator(
-        glob.glob(str(tmpdir) + "/ds_part.*.parquet"),
-        use_row_groups=True,
-        gpu_memory_frac=gpu_memory_frac,
-    )
+    encoders = processor.stats["encoders"]
+    for col in cat_names:
+        assert_cats_equal(encoders[col].get_cats(), df[col].unique())
+    return processor.ds_exports
+
 
-    df_pp = None
-    for chunk in data_itr_2:
-        df_pp = cudf.concat([df_pp, chunk], axis=0) if df_pp else chunk
+@cleanup
+@pytest.mark.parametrize("engine", ["parquet"])
+@pytest.mark.parametrize("op_columns", [None])
+def test_workflow_write_roundtrip(tmpdir, df, dataset, api_processor, engine, op_columns):
+    cat_names = ["name-cat", "name-string"]
+    processor = api_processor
 
-    if engine == "parquet":
-        assert df_pp["name-cat"].dtype == "int64"
-    assert df_pp["name-string"].dtype == "int64"
+    # Write to new "processed" dataset (sharding is covered by
+    # test_write_to_dataset_shuffle_partitioning)
+    processor.write_to_dataset(tmpdir, dataset, nfiles=1, shuffle=False, apply_ops=True)
 
-    num_rows, num_row_groups, col_names = cudf.io.read_parquet_metadata(str(tmpdir) + "/_metadata")
-    assert num_rows == len(df_pp)
+    check_written_dataset(tmpdir, cat_names, len(df))
     return processor.ds_exports
 
 
 @pytest.mark.parametrize("batch", [0, 100, 1000])
-def test_gpu_file_iterator_parquet(datasets, batch):
-    paths = glob.glob(str(datasets["parquet"]) + "/*.parquet")
-    df_expect = cudf.read_parquet(paths[0], columns=mycols_pq)
-    df_itr = cudf.DataFrame()
+def test_gpu_file_iterator_parquet(parquet_expect, batch):
+    paths, df_expect, _ = parquet_expect
     data_itr = nvtabular.io.GPUFileIterator(
         paths[0], batch_size=batch, gpu_memory_frac=0.01, columns=mycols_pq
     )
-    for data_gd in data_itr:
-        df_itr = cudf.concat([df_itr, data_gd], axis=0) if df_itr else data_gd
+    chunks = [data_gd for data_gd in data_itr]
+    df_itr = cudf.concat(chunks, axis=0) if chunks else cudf.DataFrame()
 
     assert_eq(df_itr.reset_index(drop=True), df_expect.reset_index(drop=True))
 
@@ -120,29 +142,26 @@ def test_gpu_file_iterator_csv(datasets, batch, dskey):
     paths = glob.glob(str(datasets[dskey]) + "/*.csv")
     names = allcols_csv if dskey == "csv-no-header" else None
     header = None if dskey == "csv-no-header" else 0
-    df_expect = cudf.read_csv(paths[0], header=header, names=names)[mycols_csv]
-    df_expect["id"] = df_expect["id"].astype("int64")
-    df_itr = cudf.DataFrame()
+    df_expect = cudf.read_csv(
+        paths[0], header=header, names=names, usecols=mycols_csv, dtype={"id": "int64"}
+    )[mycols_csv]
     data_itr = nvtabular.io.GPUFileIterator(
         paths[0], batch_size=batch, gpu_memory_frac=0.01, columns=mycols_csv, names=names,
     )
-    for data_gd in data_itr:
-        df_itr = cudf.concat([df_itr, data_gd], axis=0) if df_itr else data_gd
+    chunks = [data_gd for data_gd in data_itr]
+    df_itr = cudf.concat(chunks, axis=0) if chunks else cudf.DataFrame()
 
     assert_eq(df_itr.reset_index(drop=True), df_expect.reset_index(drop=True))
 
 
 @pytest.mark.parametrize("batch", [0, 100, 1000])
-def test_gpu_dataset_iterator_parquet(datasets, batch):
-    paths = glob.glob(str(datasets["parquet"]) + "/*.parquet")
-    df_expect = cudf.read_parquet(paths[0], columns=mycols_pq)
-    df_expect = cudf.concat([df_expect, cudf.read_parquet(paths[1], columns=mycols_pq)], axis=0)
-    df_itr = cudf.DataFrame()
+def test_gpu_dataset_iterator_parquet(parquet_expect, batch):
+    paths, _, df_expect = parquet_expect
     data_itr = nvtabular.io.GPUDatasetIterator(
         paths, batch_size=batch, gpu_memory_frac=0.01, columns=mycols_pq
     )
-    for data_gd in data_itr:
-        df_itr = cudf.concat([df_itr, data_gd], axis=0) if df_itr else data_gd
+    chunks = [data_gd for data_gd in data_itr]
+    df_itr = cudf.concat(chunks, axis=0) if chunks else cudf.DataFrame()
 
     assert_eq(df_itr.reset_index(drop=True), df_expect.reset_index(drop=True))
 
@@ -150,17 +169,14 @@ def test_gpu_dataset_iterator_parquet(datasets, batch):
 @pytest.mark.parametrize("batch", [0, 100, 1000])
 @pytest.mark.parametrize("engine", ["csv", "csv-no-header"])
 def test_gpu_dataset_iterator_csv(datasets, df, dataset, batch, engine):
-    df_itr = cudf.DataFrame()
-    for data_gd in dataset:
-        df_itr = cudf.concat([df_itr, data_gd], axis=0) if df_itr else data_gd
+    chunks = [data_gd for data_gd in dataset]
+    df_itr = cudf.concat(chunks, axis=0) if chunks else cudf.DataFrame()
     assert_eq(df_itr.reset_index(drop=True), df.reset_index(drop=True))
 
 
 @cleanup
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
 @pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("dump", [True, False])
-def test_gpu_workflow(tmpdir, df, dataset, gpu_memory_frac, engine, dump):
+def test_gpu_workflow(tmpdir, df, dataset, engine):
     cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
     cont_names = ["x", "y", "id"]
     label_name = ["label"]
@@ -175,64 +191,38 @@ def test_gpu_workflow(tmpdir, df, dataset, gpu_memory_frac, engine, dump):
     )
 
     processor.update_stats(dataset)
-    if dump:
-        config_file = tmpdir + "/temp.yaml"
-        processor.save_stats(config_file)
-        processor.clear_stats()
-        processor.load_stats(config_file)
 
     def get_norms(tar: cudf.Series):
-        gdf = tar.fillna(0)
-        gdf = gdf * (gdf >= 0).astype("int")
-        return gdf
+        # ZeroFill, as a single elementwise kernel
+        return cudf.Series(cp.clip(tar.fillna(0).values, 0, None))
+
+    (mean_x, std_x), (mean_y, std_y) = moments(get_norms(df.x), get_norms(df.y))
 
-    assert math.isclose(get_norms(df.x).mean(), processor.stats["means"]["x"], rel_tol=1e-4)
-    assert math.isclose(get_norms(df.y).mean(), processor.stats["means"]["y"], rel_tol=1e-4)
+    assert math.isclose(mean_x, processor.stats["means"]["x"], rel_tol=1e-4)
+    assert math.isclose(mean_y, processor.stats["means"]["y"], rel_tol=1e-4)
     #     assert math.isclose(get_norms(df.id).mean(),
     #                         processor.stats["means"]["id_ZeroFill_LogOp"], rel_tol=1e-4)
-    assert math.isclose(get_norms(df.x).std(), processor.stats["stds"]["x"], rel_tol=1e-3)
-    assert math.isclose(get_norms(df.y).std(), processor.stats["stds"]["y"], rel_tol=1e-3)
+    assert math.isclose(std_x, processor.stats["stds"]["x"], rel_tol=1e-3)
+    assert math.isclose(std_y, processor.stats["stds"]["y"], rel_tol=1e-3)
     #     assert math.isclose(get_norms(df.id).std(),
     #                         processor.stats["stds"]["id_ZeroFill_LogOp"], rel_tol=1e-3)
 
     # Check that categories match
-    if engine == "parquet":
-        cats_expected0 = df["name-cat"].unique().values_to_string()
-        cats0 = processor.stats["encoders"]["name-cat"].get_cats().values_to_string()
-        # adding the None entry as a string because of move from gpu
-        assert cats0 == ["None"] + cats_expected0
-    cats_expected1 = df["name-string"].unique().values_to_string()
-    cats1 = processor.stats["encoders"]["name-string"].get_cats().values_to_string()
-    # adding the None entry as a string because of move from gpu
-    assert cats1 == ["None"] + cats_expected1
-
-    # Write to new "shuffled" and "processed" dataset
-    processor.write_to_dataset(tmpdir, dataset, nfiles=10, shuffle=True, apply_ops=True)
-
-    data_itr_2 = nvtabular.io.GPUDatasetIterator(
-        glob.glob(str(tmpdir) + "/ds_part.*.parquet"),
-        use_row_groups=True,
-        gpu_memory_frac=gpu_memory_frac,
-    )
+    encoders = processor.stats["encoders"]
+    for col in cat_names:
+        assert_cats_equal(encoders[col].get_cats(), df[col].unique())
 
-    df_pp = None
-    for chunk in data_itr_2:
-        df_pp = cudf.concat([df_pp, chunk], axis=0) if df_pp else chunk
+    # Write to new "processed" dataset (sharding is covered by
+    # test_write_to_dataset_shuffle_partitioning)
+    processor.write_to_dataset(tmpdir, dataset, nfiles=1, shuffle=False, apply_ops=True)
 
-    if engine == "parquet":
-        assert df_pp["name-cat"].dtype == "int64"
-    assert df_pp["name-string"].dtype == "int64"
-
-    num_rows, num_row_groups, col_names = cudf.io.read_parquet_metadata(str(tmpdir) + "/_metadata")
-    assert num_rows == len(df_pp)
+    check_written_dataset(tmpdir, cat_names, len(df))
     return processor.ds_exports
 
 
-@pytest.mark.parametrize("gpu_memory_frac", [0.01, 0.1])
 @pytest.mark.parametrize("engine", ["parquet", "csv", "csv-no-header"])
-@pytest.mark.parametrize("dump", [True, False])
 @pytest.mark.parametrize("replace", [True, False])
-def test_gpu_workflow_config(tmpdir, df, dataset, gpu_memory_frac, engine, dump, replace):
+def test_gpu_workflow_config(tmpdir, df, dataset, engine, replace):
     cat_names = ["name-cat", "name-string"] if engine == "parquet" else ["name-string"]
     cont_names = ["x", "y", "id"]
     label_name = ["label"]
@@ -249,12 +239,6 @@ def test_gpu_workflow_config(tmpdir, df, dataset, gpu_memory_frac, engine, dump,
 
     processor.update_stats(dataset)
 
-    if dump:
-        config_file = tmpdir + "/temp.yaml"
-        processor.save_stats(config_file)
-        processor.clear_stats()
-        processor.load_stats(config_file)
-
     def get_norms(tar: cudf.Series):
         ser_median = tar.dropna().quantile(0.5, interpolation="linear")
         gdf = tar.fillna(ser_median)
@@ -266,48 +250,132 @@ def test_gpu_workflow_config(tmpdir, df, dataset, gpu_memory_frac, engine, dump,
     concat_ops = "_FillMissing_LogOp"
     if replace:
         concat_ops = ""
-    assert math.isclose(
-        get_norms(df.x).mean(), processor.stats["means"]["x" + concat_ops], rel_tol=1e-1,
-    )
-    assert math.isclose(
-        get_norms(df.y).mean(), processor.stats["means"]["y" + concat_ops], rel_tol=1e-1,
-    )
+    (mean_x, std_x), (mean_y, std_y) = moments(get_norms(df.x), get_norms(df.y))
 
-    assert math.isclose(
-        get_norms(df.x).std(), processor.stats["stds"]["x" + concat_ops], rel_tol=1e-1,
-    )
-    assert math.isclose(
-        get_norms(df.y).std(), processor.stats["stds"]["y" + concat_ops], rel_tol=1e-1,
-    )
+    assert math.isclose(mean_x, processor.stats["means"]["x" + concat_ops], rel_tol=1e-1)
+    assert math.isclose(mean_y, processor.stats["means"]["y" + concat_ops], rel_tol=1e-1)
+    assert math.isclose(std_x, processor.stats["stds"]["x" + concat_ops], rel_tol=1e-1)
+    assert math.isclose(std_y, processor.stats["stds"]["y" + concat_ops], rel_tol=1e-1)
 
     # Check that categories match
-    if engine == "parquet":
-        cats_expected0 = df["name-cat"].unique().values_to_string()
-        cats0 = processor.stats["encoders"]["name-cat"].get_cats().values_to_string()
-        # adding the None entry as a string because of move from gpu
-        assert cats0 == ["None"] + cats_expected0
-    cats_expected1 = df["name-string"].unique().values_to_string()
-    cats1 = processor.stats["encoders"]["name-string"].get_cats().values_to_string()
-    # adding the None entry as a string because of move from gpu
-    assert cats1 == ["None"] + cats_expected1
-
-    # Write to new "shuffled" and "processed" dataset
-    processor.write_to_dataset(tmpdir, dataset, nfiles=10, shuffle=True, apply_ops=True)
-
-    data_itr_2 = nvtabular.io.GPUDatasetIterator(
-        glob.glob(str(tmpdir) + "/ds_part.*.parquet"),
-        use_row_groups=True,
-        gpu_memory_frac=gpu_memory_frac,
-    )
-
-    df_pp = None
-    for chunk in data_itr_2:
-        df_pp = cudf.concat([df_pp, chunk], axis=0) if df_pp else chunk
+    encoders = processor.stats["encoders"]
+    for col in cat_names:
+        assert_cats_equal(encoders[col].get_cats(), df[col].unique())
 
-    if engine == "parquet":
-        assert df_pp["name-cat"].dtype == "int64"
-    assert df_pp["name-string"].dtype == "int64"
+    # Write to new "processed" dataset (sharding is covered by
+    # test_write_to_dataset_shuffle_partitioning)
+    processor.write_to_dataset(tmpdir, dataset, nfiles=1, shuffle=False, apply_ops=True)
 
-    num_rows, num_row_groups, col_names = cudf.io.read_parquet_metadata(str(tmpdir) + "/_metadata")
-    assert num_rows == len(df_pp)
+    check_written_dataset(tmpdir, cat_names, len(df))
     return processor.ds_exports
+
+
+@pytest.mark.parametrize("engine", ["parquet"])
+def test_workflow_serialization_roundtrip(tmpdir, dataset, engine):
+    cat_names = ["name-cat", "name-string"]
+    cont_names = ["x", "y", "id"]
+    label_name = ["label"]
+
+    processor = nvt.Workflow(cat_names=cat_names, cont_names=cont_names, label_name=label_name)
+    processor.add_preprocess(ops.Normalize())
+    processor.add_preprocess(ops.Categorify())
+    processor.finalize()
+    processor.update_stats(dataset)
+
+    means = dict(processor.stats["means"])
+    stds = dict(processor.stats["stds"])
+    # Categories stay on device; they are compared after the round trip
+    cats = {col: enc.get_cats() for col, enc in processor.stats["encoders"].items()}
+
+    config_file = tmpdir + "/temp.yaml"
+    processor.save_stats(config_file)
+    processor.clear_stats()
+    assert not processor.stats
+    processor.load_stats(config_file)
+
+    assert processor.stats["means"] == pytest.approx(means)
+    assert processor.stats["stds"] == pytest.approx(stds)
+    assert set(processor.stats["encoders"]) == set(cats)
+    for col, enc in processor.stats["encoders"].items():
+        assert_cats_equal(enc.get_cats(), cats[col][1:])
+
+
+@pytest.mark.parametrize("engine", ["parquet"])
+def test_gpu_memory_frac_scaling(df, paths, engine):
+    cat_names = ["name-cat", "name-string"]
+    cont_names = ["x", "y", "id"]
+    label_name = ["label"]
+
+    # Derive the fractions from the reader's own row-size estimate, so that
+    # both of them split every file into several chunks whatever the amount
+    # of free GPU memory
+    row_size = nvtabular.io.PQFileReader(
+        paths[0], gpu_memory_frac=0.01, batch_size=None
+    ).estimated_row_size
+    free_mem = rmm.get_info().free
+    small, large = [rows * row_size / free_mem for rows in (256, 1024)]
+
+    # Chunk size only changes how many chunks the dataset is read in, so the
+    # statistics must not depend on it
+    num_chunks = {}
+    stats = {}
+    for gpu_memory_frac in [small, large]:
+        dataset = nvtabular.io.GPUDatasetIterator(
+            paths, columns=mycols_pq, use_row_groups=False, gpu_memory_frac=gpu_memory_frac
+        )
+        num_chunks[gpu_memory_frac] = sum(1 for _ in dataset)
+
+        processor = nvt.Workflow(cat_names=cat_names, cont_names=cont_names, label_name=label_name)
+        processor.add_preprocess(ops.Normalize())
+        processor.add_preprocess(ops.Categorify())
+        processor.finalize()
+        processor.update_stats(dataset)
+        stats[gpu_memory_frac] = processor.stats
+
+    assert num_chunks[small] > num_chunks[large] > len(paths)
+    assert stats[small]["counts"]["x"] == stats[large]["counts"]["x"] == df["x"].count()
+    assert stats[small]["means"] == pytest.approx(stats[large]["means"])
+    assert stats[small]["stds"] == pytest.approx(stats[large]["stds"])
+    for col in cat_names:
+        cats_small = stats[small]["encoders"][col].get_cats()
+        cats_large = stats[large]["encoders"][col].get_cats()
+        assert_cats_equal(cats_small, cats_large[1:])
+
+
+@pytest.mark.parametrize("engine", ["parquet"])
+def test_write_to_dataset_shuffle_partitioning(tmpdir, paths, engine):
+    nfiles = 10
+    dataset = nvtabular.io.GPUDatasetIterator(
+        paths, columns=["timestamp"] + mycols_pq, use_row_groups=True, gpu_memory_frac=0.01
+    )
+
+    # The source rows are sorted by timestamp (save for a couple of nulls)
+    timestamps = [gdf["timestamp"].astype("int64").fillna(0).values for gdf in dataset]
+    expected = cp.concatenate(timestamps)
+
+    processor = nvt.Workflow(
+        cat_names=["name-cat", "name-string"], cont_names=["x", "y", "id"], label_name=["label"]
+    )
+    processor.write_to_dataset(tmpdir, dataset, nfiles=nfiles, shuffle=True)
+
+    parts = sorted(glob.glob(str(tmpdir) + "/ds_part.*.parquet"))
+    assert len(parts) == nfiles
+
+    # Every chunk is split evenly across the files, one of them taking the remainder
+    counts = [pq.read_metadata(part).num_rows for part in parts]
+    assert sum(counts) == len(expected)
+    assert max(counts) - min(counts) <= (nfiles - 1) * len(timestamps)
+
+    written = cp.concatenate(
+        [
+            cudf.read_parquet(part, columns=["timestamp"])["timestamp"]
+            .astype("int64")
+            .fillna(0)
+            .values
+            for part in parts
+        ]
+    )
+    # Same rows, but roughly half of the neighbours out of order after a shuffle
+    assert bool((cp.sort(written) == cp.sort(expected)).all())
+    ascending = float((cp.diff(written) > 0).mean())
+    assert 0.4 < ascending < 0.6